@@ -1,5 +1,7 @@
 import os
 import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+from pandas.io.formats.format import DataFrameFormatter
 import plotly.graph_objs as go
 import plotly.express as px
 import plotly.utils
@@ -9,8 +11,42 @@ from scipy import stats
 from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
 from werkzeug.utils import secure_filename
 import openai
-from io import StringIO
+from io import StringIO, BytesIO
 import tempfile
+import hashlib
+import pickle
+import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+try:
+    import polars as pl
+    from pipeline import run_pipeline
+except ImportError:  # polars is optional; fall back to pandas for CSV parsing and analysis
+    pl = None
+
+try:
+    from kernels import iqr_mask, zscore_mask, kernel_lock
+except ImportError:  # numba is optional; fall back to numpy/scipy for outlier masks
+    iqr_mask = zscore_mask = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional; fall back to blake2b for cache keys
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the Plotly JSON encoder
+    orjson = None
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from pyarrow import compute as pc
+except ImportError:  # pyarrow is optional; fall back to pandas for CSV parsing and duplicate removal
+    pa = None
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this in production
@@ -18,64 +54,256 @@ app.secret_key = 'your-secret-key-here'  # Change this in production
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
+BOXPLOT_MAX_POINTS = 10000  # Maximum number of outlier points drawn per box plot
+JIT_MIN_CELLS = 1_000_000  # Numerical blocks at least this large use the numba kernels
+AI_INSIGHTS_TIMEOUT = 10  # Seconds to wait for the OpenAI response
+USE_POLARS_IO = os.getenv('USE_POLARS_IO', 'True').lower() == 'true'  # Parse uploads with polars when installed
+USE_POLARS_PIPELINE = os.getenv('USE_POLARS_PIPELINE', 'False').lower() == 'true'  # Clean and analyze with polars
+LOW_PRECISION_EDA = os.getenv('LOW_PRECISION_EDA', 'False').lower() == 'true'  # Analyze numerical data as float32
 
-# Create uploads directory if it doesn't exist
+CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cache')  # Analysis results keyed by upload content
+CACHE_MAX_ENTRIES = 256  # Oldest cached results are deleted beyond this many files
+
+# Create uploads and cache directories if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
 
 # OpenAI API configuration (set your API key in environment variable)
 openai.api_key = os.getenv('OPENAI_API_KEY')
+AI_NOT_CONFIGURED = "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
+
+# Data preview table, rendered by Jinja with every cell autoescaped
+PREVIEW_TABLE = app.jinja_env.from_string(
+    '<table class="dataframe table table-striped">'
+    '<thead><tr>{% for col in columns %}<th>{{ col }}</th>{% endfor %}</tr></thead>'
+    '<tbody>{% for row in rows %}<tr>'
+    '{% for value in row %}<td>{{ value }}</td>{% endfor %}'
+    '</tr>{% endfor %}</tbody>'
+    '</table>'
+)
+
+def preview_table(df, rows=10):
+    """Render the first rows of a DataFrame as an HTML table"""
+    head = df.head(rows)
+    # Cells use pandas' display formatting (float precision, dates, NaN/NaT), as in DataFrame.to_html
+    formatter = DataFrameFormatter(head)
+    columns = [[value.strip() for value in formatter.format_col(i)] for i in range(len(head.columns))]
+    return PREVIEW_TABLE.render(columns=list(head.columns), rows=zip(*columns))
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+# Numerical columns of a DataFrame together with their values as one float ndarray and the
+# per-column quantiles (rows: min, Q1, median, Q3, max) shared by the analysis stages
+NumericView = namedtuple('NumericView', 'cols arr quantiles')
+
+def numeric_view(df):
+    """Extract the numerical columns of a DataFrame as a NumericView"""
+    cols = df.select_dtypes(include=[np.number]).columns
+    if LOW_PRECISION_EDA:
+        # Halve the memory traffic of the numerical work; results are shown at display precision
+        dtype = np.float32
+    else:
+        # Smallest float type that holds every column, so float32 data is not upcast again
+        dtype = np.result_type(np.float32, *df[cols].dtypes)
+    arr = df[cols].to_numpy(dtype=dtype)
+    if len(cols) > 0:
+        quantiles = np.nanpercentile(arr, [0, 25, 50, 75, 100], axis=0)
+    else:
+        quantiles = np.empty((5, 0), dtype=dtype)
+    return NumericView(cols, arr, quantiles)
+
+def correlation_matrix(nv):
+    """Pearson correlation matrix of the numerical columns in a NumericView"""
+    if len(nv.arr) < 2:
+        # np.corrcoef would treat a single row as one variable and return a scalar
+        return np.full((len(nv.cols), len(nv.cols)), np.nan)
+    if np.isnan(nv.arr).any():
+        # np.corrcoef has no pairwise NaN handling; pandas excludes missing values per column pair
+        return pd.DataFrame(nv.arr).corr().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.corrcoef(nv.arr, rowvar=False)
+
+def read_csv(file):
+    """Read an uploaded CSV file-like object into a pandas DataFrame"""
+    if USE_POLARS_IO and pl is not None:
+        # Multi-threaded polars parser; downstream code still works on pandas
+        try:
+            # Same missing value markers as pandas, e.g. NA, N/A and nan, not only empty fields
+            df = pl.read_csv(file, infer_schema_length=10000, null_values=sorted(STR_NA_VALUES))
+        except pl.exceptions.PolarsError:
+            # e.g. a type change after the inferred rows; pandas infers types from the whole file
+            df = None
+        # Duplicate headers are renamed differently by polars, so those files are left to pandas too
+        if df is not None and not any('_duplicated_' in col for col in df.columns):
+            return parse_padded_numbers(df).to_pandas()
+        file.seek(0)
+    return pd.read_csv(file)
+
+def parse_padded_numbers(df):
+    """Convert polars text columns that hold space-padded numbers to numerical columns
+
+    pandas ignores whitespace around numbers, while polars infers such columns as text.
+    """
+    for col, dtype in df.schema.items():
+        if dtype != pl.Utf8:
+            continue
+        stripped = df.get_column(col).str.strip_chars()
+        for number_type in (pl.Int64, pl.Float64):
+            try:
+                df = df.with_columns(stripped.cast(number_type).alias(col))
+                break
+            except pl.exceptions.PolarsError:
+                # Not every value is a number of this type
+                continue
+    return df
+
+def read_csv_table(file):
+    """Read an uploaded CSV file-like object into a pyarrow Table"""
+    table = pa_csv.read_csv(
+        file,
+        read_options=pa_csv.ReadOptions(block_size=8 << 20),
+        # Treat empty fields in text columns as missing, like pandas does
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+    )
+    if len(set(table.column_names)) < table.num_columns:
+        # Arrow keeps duplicate headers, which polars rejects; rename them like pandas does
+        table = table.rename_columns(dedup_column_names(table.column_names))
+    return table
+
+def dedup_column_names(names):
+    """Make column names unique the way pandas.read_csv does: a, a.1, a.2, ..."""
+    taken = set(names)
+    counts = {}
+    unique_names = []
+    for name in names:
+        base = name
+        count = counts.get(base, 0)
+        while count > 0:
+            counts[base] = count + 1
+            name = f'{base}.{count}'
+            # Skip suffixes that are already taken by another header
+            count = count + 1 if name in taken else counts.get(name, 0)
+        unique_names.append(name)
+        counts[name] = count + 1
+    return unique_names
+
+def drop_duplicate_rows(df):
+    """Remove duplicate rows, keeping the first occurrence of each
+
+    The DataFrame is returned as is, without a copy, when it has no duplicates.
+    """
+    if pa is None or df.empty or not df.columns.is_unique:
+        duplicated = df.duplicated()
+        return df.take(np.flatnonzero(~duplicated)) if duplicated.any() else df
+    try:
+        # Group on every column with Arrow's vectorized hash kernels and keep the first row of each group
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        keys = []
+        for column in table.columns:
+            # Hashing tells -0.0 from 0.0 while pandas compares them as equal, so add 0.0 to turn -0.0 into 0.0
+            if pa.types.is_floating(column.type):
+                column = pc.add(column, 0.0)
+            if column.null_count == len(column):
+                column = pc.is_null(column)
+            elif column.null_count > 0:
+                # Arrow's grouping does not reliably merge rows with nulls in several key columns,
+                # so missing values become their own boolean key and are filled in the column itself
+                keys.append(pc.is_null(column))
+                column = pc.fill_null(column, pc.min(column))
+            keys.append(column)
+        keys.append(pa.array(np.arange(len(df))))
+        names = [str(i) for i in range(len(keys))]
+        first_rows = pa.Table.from_arrays(keys, names=names).group_by(names[:-1]).aggregate(
+            [(names[-1], 'min')]
+        ).column(f'{names[-1]}_min')
+    except pa.ArrowException:
+        # Columns Arrow cannot convert or hash (e.g. mixed-type objects) fall back to pandas
+        duplicated = df.duplicated()
+        return df.take(np.flatnonzero(~duplicated)) if duplicated.any() else df
+    if len(first_rows) == len(df):
+        return df
+    return df.take(np.sort(first_rows.to_numpy()))
 
 def clean_data(df):
     """Clean the dataset by handling missing values, duplicates, and column names"""
     # Create a copy to avoid modifying original
-    df_clean = df.copy()
-    
+    return clean_data_inplace(df.copy())
+
+def clean_data_inplace(df_clean):
+    """Clean the dataset like clean_data, but without copying it first
+
+    The passed DataFrame may be modified; use the returned DataFrame.
+    """
     # Clean column names (remove spaces, special characters)
-    df_clean.columns = df_clean.columns.str.strip().str.replace(' ', '_').str.replace('[^a-zA-Z0-9_]', '')
+    df_clean.columns = df_clean.columns.str.strip().str.replace(' ', '_').str.replace('[^a-zA-Z0-9_]', '', regex=True)
     
     # Remove duplicate rows
-    df_clean = df_clean.drop_duplicates()
+    df_clean = drop_duplicate_rows(df_clean)
     
-    # Handle missing values
-    for col in df_clean.columns:
-        if df_clean[col].dtype in ['int64', 'float64']:
-            # For numerical columns, fill with median
-            df_clean[col] = df_clean[col].fillna(df_clean[col].median())
-        else:
-            # For categorical columns, fill with mode
-            mode_val = df_clean[col].mode()
-            if len(mode_val) > 0:
-                df_clean[col] = df_clean[col].fillna(mode_val[0])
-            else:
-                df_clean[col] = df_clean[col].fillna('Unknown')
+    # Handle missing values in one vectorized pass per dtype group
+    # For numerical columns, fill with median
+    num = df_clean.select_dtypes(include=[np.number])
+    if len(num.columns) > 0:
+        df_clean[num.columns] = num.fillna(num.median())
+    
+    # For categorical columns, fill with mode (or 'Unknown' when there is none)
+    cat = df_clean.select_dtypes(exclude=[np.number])
+    if len(cat.columns) > 0:
+        # mode() has no rows when every categorical column is entirely missing
+        modes = cat.mode()
+        if len(modes) > 0:
+            cat = cat.fillna(modes.iloc[0])
+        df_clean[cat.columns] = cat.fillna('Unknown')
     
     return df_clean
 
-def detect_outliers(df, method='iqr'):
+def detect_outliers(df, method='iqr', nv=None):
     """Detect outliers using IQR or Z-score method"""
     outliers = {}
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    if nv is None:
+        nv = numeric_view(df)
+    if len(nv.cols) == 0:
+        return outliers
     
-    for col in numerical_cols:
-        if method == 'iqr':
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            outliers[col] = df[(df[col] < lower_bound) | (df[col] > upper_bound)][col]
-        elif method == 'zscore':
-            z_scores = np.abs(stats.zscore(df[col].dropna()))
-            outliers[col] = df[col][z_scores > 3]
+    # Work on the whole numerical block at once instead of column by column
+    arr = nv.arr
+    if method == 'iqr':
+        Q1, Q3 = nv.quantiles[1], nv.quantiles[3]
+        IQR = Q3 - Q1
+        lower_bound = Q1 - 1.5 * IQR
+        upper_bound = Q3 + 1.5 * IQR
+        if iqr_mask is not None and arr.size >= JIT_MIN_CELLS:
+            # Packed bitset per column; only columns that have outliers are unpacked
+            with kernel_lock:
+                bits, counts = iqr_mask(arr, lower_bound, upper_bound)
+            for i, col in enumerate(nv.cols):
+                if counts[i] == 0:
+                    outliers[col] = df[col].iloc[:0]
+                else:
+                    col_mask = np.unpackbits(bits[i].view(np.uint8), count=len(arr), bitorder='little')
+                    outliers[col] = df[col][col_mask.astype(bool)]
+            return outliers
+        mask = (arr < lower_bound) | (arr > upper_bound)
+    elif method == 'zscore':
+        if zscore_mask is not None and arr.size >= JIT_MIN_CELLS:
+            with kernel_lock:
+                mask = zscore_mask(arr, 3.0)
+        else:
+            z_scores = np.abs(stats.zscore(arr, axis=0, nan_policy='omit'))
+            mask = z_scores > 3
+    else:
+        return outliers
+    
+    for i, col in enumerate(nv.cols):
+        outliers[col] = df[col][mask[:, i]]
     
     return outliers
 
-def generate_eda_report(df, outliers):
+def generate_eda_report(df, outliers, nv=None, corr=None):
     """Generate comprehensive EDA report"""
     report = {}
     
@@ -87,10 +315,31 @@ def generate_eda_report(df, outliers):
     # Missing values
     report['missing_values'] = df.isnull().sum().to_dict()
     
-    # Descriptive statistics
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    # Descriptive statistics, computed directly on the numerical block
+    if nv is None:
+        nv = numeric_view(df)
+    numerical_cols, arr = nv.cols, nv.arr
     if len(numerical_cols) > 0:
-        report['descriptive_stats'] = df[numerical_cols].describe().to_dict()
+        counts = (~np.isnan(arr)).sum(axis=0)
+        # Columns without values, or a single row for the std, give NaN like pandas, without a warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(arr, axis=0)
+            stds = np.nanstd(arr, axis=0, ddof=1)
+        mins, q1, medians, q3, maxs = nv.quantiles
+        report['descriptive_stats'] = {
+            col: {
+                'count': float(counts[i]),
+                'mean': float(means[i]),
+                'std': float(stds[i]),
+                'min': float(mins[i]),
+                '25%': float(q1[i]),
+                '50%': float(medians[i]),
+                '75%': float(q3[i]),
+                'max': float(maxs[i])
+            }
+            for i, col in enumerate(numerical_cols)
+        }
     else:
         report['descriptive_stats'] = {}
     
@@ -104,94 +353,244 @@ def generate_eda_report(df, outliers):
     
     # Correlation matrix (only for numerical columns)
     if len(numerical_cols) > 1:
-        correlation_matrix = df[numerical_cols].corr()
-        report['correlation'] = correlation_matrix.to_dict()
+        if corr is None:
+            corr = correlation_matrix(nv)
+        report['correlation'] = {
+            col: dict(zip(numerical_cols, corr[:, i].tolist()))
+            for i, col in enumerate(numerical_cols)
+        }
     else:
         report['correlation'] = {}
     
     return report
 
-def create_plots(df, outliers):
+def figure_to_json(fig):
+    """Serialize a Plotly figure to a JSON string"""
+    if orjson is not None:
+        # Values orjson cannot handle natively are passed to the Plotly encoder
+        return orjson.dumps(
+            fig.to_plotly_json(),
+            default=plotly.utils.PlotlyJSONEncoder().default,
+            option=orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+@lru_cache(maxsize=None)
+def _plot_executor():
+    """Thread pool shared across requests for building per-column plots"""
+    return ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def _histogram_json(col, values):
+    """Build the histogram of one numerical column, binned with numpy so only the bin counts are serialized"""
+    # Infinite values would make the autodetected bin range infinite, so only finite values are binned
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=30)
+    fig_hist = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        name=col
+    ))
+    fig_hist.update_layout(
+        title=f"Distribution of {col}",
+        xaxis_title=col,
+        yaxis_title="count",
+        bargap=0
+    )
+    return figure_to_json(fig_hist)
+
+def _boxplot_json(col, q1, median, q3, lowerfence, upperfence, fliers):
+    """Build the box plot of one numerical column from precomputed quartiles and outliers"""
+    fig_box = go.Figure(go.Box(
+        x=[col],
+        q1=[q1],
+        median=[median],
+        q3=[q3],
+        lowerfence=[lowerfence],
+        upperfence=[upperfence],
+        name=col
+    ))
+    fliers = np.asarray(fliers, dtype=float)
+    if len(fliers) > 0:
+        fliers = fliers[::-(-len(fliers) // BOXPLOT_MAX_POINTS)]
+        fig_box.add_trace(go.Scatter(
+            x=[col] * len(fliers),
+            y=fliers,
+            mode='markers',
+            name='outliers'
+        ))
+    fig_box.update_layout(
+        title=f"Box Plot of {col} (with outliers)",
+        yaxis_title=col,
+        showlegend=False
+    )
+    return figure_to_json(fig_box)
+
+def create_plots(df, outliers, nv=None, corr=None):
     """Create interactive Plotly visualizations"""
     plots = {}
     
     # Correlation heatmap
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    if nv is None:
+        nv = numeric_view(df)
+    numerical_cols = nv.cols
     if len(numerical_cols) > 1:
-        correlation_matrix = df[numerical_cols].corr()
+        if corr is None:
+            corr = correlation_matrix(nv)
         fig_heatmap = px.imshow(
-            correlation_matrix,
+            pd.DataFrame(corr, index=numerical_cols, columns=numerical_cols),
             text_auto=True,
             aspect="auto",
             title="Correlation Heatmap"
         )
-        plots['correlation_heatmap'] = json.dumps(fig_heatmap, cls=plotly.utils.PlotlyJSONEncoder)
+        plots['correlation_heatmap'] = figure_to_json(fig_heatmap)
+    
+    # Per-column plots are independent, so build them on the shared thread pool
+    executor = _plot_executor()
     
     # Histograms for numerical columns
-    histograms = {}
-    for col in numerical_cols:
-        fig_hist = px.histogram(
-            df, 
-            x=col, 
-            title=f"Distribution of {col}",
-            nbins=30
-        )
-        histograms[col] = json.dumps(fig_hist, cls=plotly.utils.PlotlyJSONEncoder)
-    plots['histograms'] = histograms
+    plots['histograms'] = dict(zip(numerical_cols, executor.map(_histogram_json, numerical_cols, nv.arr.T)))
     
-    # Box plots for outlier visualization
+    # Box plots for outlier visualization, built from server-side quartiles so only the
+    # summary statistics and the outlier points are serialized instead of every value
     boxplots = {}
-    for col in numerical_cols:
-        fig_box = px.box(
-            df, 
-            y=col, 
-            title=f"Box Plot of {col} (with outliers)"
-        )
-        boxplots[col] = json.dumps(fig_box, cls=plotly.utils.PlotlyJSONEncoder)
+    if len(numerical_cols) > 0:
+        _, q1, medians, q3, _ = nv.quantiles
+        iqr = q3 - q1
+        with np.errstate(invalid='ignore'):
+            inside = np.where((nv.arr >= q1 - 1.5 * iqr) & (nv.arr <= q3 + 1.5 * iqr), nv.arr, np.nan)
+        # Whiskers end at the most extreme values within 1.5 IQR of the box
+        lower_fences = np.nanmin(inside, axis=0)
+        upper_fences = np.nanmax(inside, axis=0)
+        fliers = [outliers.get(col, []) for col in numerical_cols]
+        boxplots = dict(zip(numerical_cols, executor.map(
+            _boxplot_json, numerical_cols, q1, medians, q3, lower_fences, upper_fences, fliers
+        )))
     plots['boxplots'] = boxplots
     
     return plots
 
+def save_cleaned_data(df):
+    """Save the cleaned data to a temporary file for download and return its path"""
+    if pa is not None:
+        # Columnar Parquet is much cheaper to write than CSV; converted on demand in download_file
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.parquet')
+        temp_file.close()
+        try:
+            df.to_parquet(temp_file.name, engine='pyarrow', compression='zstd', index=False)
+            return temp_file.name
+        except (pa.ArrowException, ValueError):
+            # Data Arrow cannot represent (e.g. mixed-type columns) is saved as CSV instead
+            os.remove(temp_file.name)
+    
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
+    df.to_csv(temp_file.name, index=False)
+    temp_file.close()
+    return temp_file.name
+
+def results_cache_key(data):
+    """Cache key for the analysis results of an uploaded file's content"""
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(data)
+    # Settings that change the results are part of the key
+    use_polars = pl is not None
+    hasher.update(repr((USE_POLARS_IO and use_polars, USE_POLARS_PIPELINE and use_polars, LOW_PRECISION_EDA)).encode())
+    return hasher.hexdigest()
+
+@lru_cache(maxsize=32)
+def load_cached_results(key):
+    """Load cached analysis results, raising FileNotFoundError when there are none"""
+    with open(os.path.join(CACHE_FOLDER, f'{key}.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+def save_cached_results(key, results):
+    """Persist analysis results so a re-upload of the same content skips the analysis"""
+    with tempfile.NamedTemporaryFile(dir=CACHE_FOLDER, suffix='.tmp', delete=False) as f:
+        pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Atomic rename, so concurrent requests never see a partially written file
+    os.replace(f.name, os.path.join(CACHE_FOLDER, f'{key}.pkl'))
+    prune_cached_results()
+
+def prune_cached_results(max_entries=CACHE_MAX_ENTRIES):
+    """Delete the oldest cached results so at most max_entries are kept on disk"""
+    entries = [entry for entry in os.scandir(CACHE_FOLDER) if entry.name.endswith('.pkl')]
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Already removed by a concurrent request
+            pass
+
+@lru_cache(maxsize=None)
+def _insights_executor():
+    """Thread pool for OpenAI requests, kept separate so they never hold up plot workers"""
+    return ThreadPoolExecutor(max_workers=4)
+
+def request_ai_insights(report, outliers):
+    """Request AI-powered insights from the OpenAI GPT API, raising on any failure"""
+    # Prepare context for GPT
+    context = f"""
+    Dataset Summary:
+    - Shape: {report['shape']}
+    - Columns: {', '.join(report['columns'])}
+    - Missing values: {sum(report['missing_values'].values())} total
+    - Outliers detected: {sum(len(outliers.get(col, [])) for col in outliers)}
+    
+    Key Statistics:
+    {json.dumps(report['descriptive_stats'], indent=2)}
+    
+    Please provide a brief, insightful analysis of this dataset highlighting:
+    1. Key patterns or trends
+    2. Potential data quality issues
+    3. Notable outliers or anomalies
+    4. Recommendations for further analysis
+    Keep the response under 200 words and focus on actionable insights.
+    """
+    
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You are a data analyst expert. Provide clear, concise insights about datasets."},
+            {"role": "user", "content": context}
+        ],
+        max_tokens=300,
+        temperature=0.7,
+        request_timeout=AI_INSIGHTS_TIMEOUT
+    )
+    
+    return response.choices[0].message.content.strip()
+
 def generate_ai_insights(df, report, outliers):
     """Generate AI-powered insights using OpenAI GPT API"""
+    if not openai.api_key:
+        return AI_NOT_CONFIGURED
     try:
-        if not openai.api_key:
-            return "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-        
-        # Prepare context for GPT
-        context = f"""
-        Dataset Summary:
-        - Shape: {report['shape']}
-        - Columns: {', '.join(report['columns'])}
-        - Missing values: {sum(report['missing_values'].values())} total
-        - Outliers detected: {sum(len(outliers.get(col, [])) for col in outliers)}
-        
-        Key Statistics:
-        {json.dumps(report['descriptive_stats'], indent=2)}
-        
-        Please provide a brief, insightful analysis of this dataset highlighting:
-        1. Key patterns or trends
-        2. Potential data quality issues
-        3. Notable outliers or anomalies
-        4. Recommendations for further analysis
-        Keep the response under 200 words and focus on actionable insights.
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a data analyst expert. Provide clear, concise insights about datasets."},
-                {"role": "user", "content": context}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content.strip()
-    
+        return request_ai_insights(report, outliers)
     except Exception as e:
         return f"Error generating AI insights: {str(e)}"
 
+def submit_ai_insights(report, outliers):
+    """Start the AI insights request in the background, or return None without an API key"""
+    if not openai.api_key:
+        return None
+    return _insights_executor().submit(request_ai_insights, report, outliers)
+
+def ai_insights_result(future):
+    """Wait for a submitted AI insights request
+
+    Returns the text to show together with whether it is a successful response that may be cached.
+    """
+    if future is None:
+        return AI_NOT_CONFIGURED, False
+    try:
+        return future.result(timeout=AI_INSIGHTS_TIMEOUT), True
+    except FutureTimeoutError:
+        return f"AI insights timed out after {AI_INSIGHTS_TIMEOUT} seconds.", False
+    except Exception as e:
+        return f"Error generating AI insights: {str(e)}", False
+
 @app.route('/')
 def index():
     """Main page with file upload form"""
@@ -227,48 +626,90 @@ def analyze():
             flash('File too large. Maximum size is 50MB.', 'error')
             return redirect(url_for('index'))
         
-        # Read CSV file
+        # Return cached results when the same content was analyzed before
+        data = file.read()
+        cache_key = results_cache_key(data)
         try:
-            df = pd.read_csv(file)
+            results = load_cached_results(cache_key)
+        except (OSError, pickle.PickleError, EOFError):
+            results = None
+        if results is not None and os.path.exists(results['download_path']):
+            # Only successful AI insights are cached; anything else is requested again
+            try:
+                ai_insights = load_cached_results(f'{cache_key}-ai')
+            except (OSError, pickle.PickleError, EOFError):
+                ai_future = submit_ai_insights(results['report'], results['outliers'])
+                ai_insights, ai_ok = ai_insights_result(ai_future)
+                if ai_ok:
+                    save_cached_results(f'{cache_key}-ai', ai_insights)
+            return render_template('results.html', ai_insights=ai_insights, **results)
+        
+        # Read CSV file; the polars pipeline consumes an Arrow table directly, without a pandas detour
+        use_pipeline = USE_POLARS_PIPELINE and pl is not None
+        try:
+            if use_pipeline and pa is not None:
+                df = read_csv_table(BytesIO(data))
+            else:
+                df = read_csv(BytesIO(data))
         except Exception as e:
             flash(f'Error reading CSV file: {str(e)}', 'error')
             return redirect(url_for('index'))
         
         # Check if dataframe is empty
-        if df.empty:
+        if 0 in df.shape:
             flash('The uploaded file is empty.', 'error')
             return redirect(url_for('index'))
         
-        # Clean the data
-        df_clean = clean_data(df)
+        # Keep what is needed from the original data before it is cleaned in place
+        original_shape = df.shape
+        original_data = preview_table(df.slice(0, 10).to_pandas() if pa is not None and isinstance(df, pa.Table) else df)
         
-        # Detect outliers
-        outliers = detect_outliers(df_clean)
+        if use_pipeline:
+            # Clean, detect outliers and generate the EDA report in one polars pipeline
+            df_clean, outliers, report = run_pipeline(df)
+            nv = numeric_view(df_clean)
+            corr = None
+        else:
+            # Clean the data in place; the upload is not needed afterwards
+            df_clean = clean_data_inplace(df)
+            
+            # Extract the numerical block and its correlation matrix once and share them
+            # between the analysis stages
+            nv = numeric_view(df_clean)
+            corr = correlation_matrix(nv) if len(nv.cols) > 1 else None
+            
+            # Detect outliers
+            outliers = detect_outliers(df_clean, nv=nv)
+            
+            # Generate EDA report
+            report = generate_eda_report(df_clean, outliers, nv=nv, corr=corr)
         
-        # Generate EDA report
-        report = generate_eda_report(df_clean, outliers)
+        # Generate AI insights in the background while the plots are created
+        ai_future = submit_ai_insights(report, outliers)
         
         # Create plots
-        plots = create_plots(df_clean, outliers)
+        plots = create_plots(df_clean, outliers, nv=nv, corr=corr)
         
-        # Generate AI insights
-        ai_insights = generate_ai_insights(df_clean, report, outliers)
+        ai_insights, ai_ok = ai_insights_result(ai_future)
         
         # Save cleaned data to temporary file for download
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-        df_clean.to_csv(temp_file.name, index=False)
-        temp_file.close()
+        download_path = save_cleaned_data(df_clean)
         
-        return render_template('results.html',
-                             original_data=df.head(10).to_html(classes='table table-striped', index=False),
-                             cleaned_data=df_clean.head(10).to_html(classes='table table-striped', index=False),
-                             report=report,
-                             plots=plots,
-                             outliers=outliers,
-                             ai_insights=ai_insights,
-                             download_path=temp_file.name,
-                             original_shape=df.shape,
-                             cleaned_shape=df_clean.shape)
+        results = dict(original_data=original_data,
+                       cleaned_data=preview_table(df_clean),
+                       report=report,
+                       plots=plots,
+                       outliers=outliers,
+                       download_path=download_path,
+                       original_shape=original_shape,
+                       cleaned_shape=df_clean.shape)
+        
+        # Cache the analysis; the AI insights only when they succeeded, so failures are retried next time
+        save_cached_results(cache_key, results)
+        if ai_ok:
+            save_cached_results(f'{cache_key}-ai', ai_insights)
+        
+        return render_template('results.html', ai_insights=ai_insights, **results)
     
     except Exception as e:
         flash(f'An error occurred during analysis: {str(e)}', 'error')
@@ -276,9 +717,20 @@ def analyze():
 
 @app.route('/download/<path:filename>')
 def download_file(filename):
-    """Download the cleaned CSV file"""
+    """Download the cleaned data as Parquet, or as CSV with ?format=csv"""
     try:
-        return send_file(filename, as_attachment=True, download_name='cleaned_data.csv')
+        if not filename.endswith('.parquet'):
+            return send_file(filename, as_attachment=True, download_name='cleaned_data.csv')
+        
+        if request.args.get('format', 'parquet') == 'csv':
+            # Converted in memory, so no temporary file is left behind per download; to_csv keeps
+            # the same format as the CSV files saved without pyarrow
+            buffer = BytesIO()
+            pd.read_parquet(filename, engine='pyarrow').to_csv(buffer, index=False)
+            buffer.seek(0)
+            return send_file(buffer, mimetype='text/csv', as_attachment=True, download_name='cleaned_data.csv')
+        
+        return send_file(filename, as_attachment=True, download_name='cleaned_data.parquet')
     except Exception as e:
         flash(f'Error downloading file: {str(e)}', 'error')
         return redirect(url_for('index'))
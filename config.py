@@ -18,6 +18,9 @@ class Config:
     MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', 50 * 1024 * 1024))  # 50MB default
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'csv'}
+    USE_POLARS_IO = os.environ.get('USE_POLARS_IO', 'True').lower() == 'true'
+    USE_POLARS_PIPELINE = os.environ.get('USE_POLARS_PIPELINE', 'False').lower() == 'true'
+    LOW_PRECISION_EDA = os.environ.get('LOW_PRECISION_EDA', 'False').lower() == 'true'
     
     # Server Configuration
     HOST = os.environ.get('HOST', '0.0.0.0')
@@ -0,0 +1,75 @@
+"""
+Numba kernels for outlier detection on large numerical blocks
+"""
+
+import threading
+import numpy as np
+from numba import njit, prange
+
+# The kernels run in parallel internally, but numba's default workqueue threading layer aborts the
+# process when they are called from several threads at once, as Flask's request threads do.
+# Callers hold this lock around each kernel call.
+kernel_lock = threading.Lock()
+
+@njit(parallel=True, cache=True)
+def zscore_mask(arr, threshold):
+    """Flag values whose absolute Z-score exceeds the threshold, column by column
+
+    Equivalent to np.abs(stats.zscore(arr, axis=0, nan_policy='omit')) > threshold, but the
+    mean, standard deviation and comparison are fused per column without temporary arrays.
+    """
+    n, k = arr.shape
+    out = np.zeros((n, k), dtype=np.bool_)
+    for j in prange(k):
+        total = 0.0
+        count = 0
+        for i in range(n):
+            x = arr[i, j]
+            if not np.isnan(x):
+                total += x
+                count += 1
+        if count == 0:
+            continue
+        mean = total / count
+
+        sq_dev = 0.0
+        for i in range(n):
+            x = arr[i, j]
+            if not np.isnan(x):
+                sq_dev += (x - mean) ** 2
+        std = np.sqrt(sq_dev / count)
+        if std == 0.0:
+            continue
+
+        limit = threshold * std
+        for i in range(n):
+            out[i, j] = abs(arr[i, j] - mean) > limit
+    return out
+
+@njit(parallel=True, cache=True)
+def iqr_mask(arr, lower, upper):
+    """Flag values outside [lower, upper] per column as a packed bitset
+
+    Returns a (k, ceil(n / 64)) uint64 array where bit i of word w in row j is set when
+    arr[w * 64 + i, j] is an outlier, together with the number of outliers per column.
+    Unpack a column with np.unpackbits(bits[j].view(np.uint8), count=n, bitorder='little').
+    """
+    n, k = arr.shape
+    words = (n + 63) // 64
+    bits = np.zeros((k, words), dtype=np.uint64)
+    counts = np.zeros(k, dtype=np.int64)
+    for j in prange(k):
+        lo = lower[j]
+        hi = upper[j]
+        count = 0
+        for w in range(words):
+            start = w * 64
+            word = np.uint64(0)
+            for i in range(start, min(start + 64, n)):
+                x = arr[i, j]
+                if x < lo or x > hi:
+                    word |= np.uint64(1) << np.uint64(i - start)
+                    count += 1
+            bits[j, w] = word
+        counts[j] = count
+    return bits, counts
@@ -0,0 +1,128 @@
+"""
+Polars implementation of the cleaning, outlier detection and EDA report stages
+"""
+
+import re
+import pandas as pd
+import polars as pl
+
+def _clean_column_name(name):
+    """Apply the same column name cleaning as app.clean_data"""
+    return re.sub('[^a-zA-Z0-9_]', '', name.strip().replace(' ', '_'))
+
+def run_pipeline(df, iqr_multiplier=1.5):
+    """Clean the dataset, detect IQR outliers and build the EDA report in one lazy polars pipeline
+
+    Accepts a pandas DataFrame, polars DataFrame or pyarrow Table. Returns the cleaned data
+    as a pandas DataFrame together with the outliers and report dictionaries, in the same
+    format as clean_data, detect_outliers and generate_eda_report.
+    """
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    elif not isinstance(df, pl.DataFrame):
+        # Arrow tables are wrapped without copying
+        df = pl.from_arrow(df)
+
+    lf = df.lazy().rename({col: _clean_column_name(col) for col in df.columns})
+    schema = lf.schema
+    numerical_cols = [col for col, dtype in schema.items() if dtype.is_numeric()]
+    other_cols = [col for col in schema if col not in numerical_cols]
+    # Null counts are cached by Arrow, so this does not scan the data; skipping columns without
+    # nulls keeps integer columns from being upcast to float by the median fill
+    null_counts = dict(zip(schema, df.null_count().row(0)))
+    fill_cols = [col for col in numerical_cols if null_counts[col] > 0]
+
+    # Remove duplicate rows, then fill numerical columns with the median and the rest with the mode
+    cleaned = (
+        lf.unique(maintain_order=True)
+        .with_columns(
+            [pl.col(col).fill_null(pl.col(col).median()) for col in fill_cols]
+            + [pl.col(col).fill_null(pl.col(col).drop_nulls().mode().sort().first()) for col in other_cols]
+        )
+        .with_columns([pl.col(col).fill_null('Unknown') for col in other_cols if schema[col] == pl.Utf8])
+    )
+
+    # Per-column statistics, computed on the same plan so both results come from one collect
+    stat_exprs = []
+    for i, col in enumerate(schema):
+        missing = pl.col(col).is_null()
+        if schema[col].is_float():
+            missing = missing | pl.col(col).is_nan()
+        stat_exprs.append(missing.sum().alias(f'missing_{i}'))
+    for i, col in enumerate(numerical_cols):
+        c = pl.col(col)
+        stat_exprs += [
+            c.count().alias(f'count_{i}'),
+            c.mean().alias(f'mean_{i}'),
+            c.std().alias(f'std_{i}'),
+            c.min().cast(pl.Float64).alias(f'min_{i}'),
+            c.quantile(0.25, interpolation='linear').alias(f'q1_{i}'),
+            c.quantile(0.5, interpolation='linear').alias(f'q2_{i}'),
+            c.quantile(0.75, interpolation='linear').alias(f'q3_{i}'),
+            c.max().cast(pl.Float64).alias(f'max_{i}'),
+        ]
+        for j in range(i + 1, len(numerical_cols)):
+            stat_exprs.append(pl.corr(col, numerical_cols[j]).alias(f'corr_{i}_{j}'))
+
+    df_clean, stats = pl.collect_all([cleaned, cleaned.select(stat_exprs)])
+    stats = stats.row(0, named=True)
+
+    # Outlier masks for every numerical column in a single parallel pass
+    bounds = {}
+    for i, col in enumerate(numerical_cols):
+        q1, q3 = stats[f'q1_{i}'], stats[f'q3_{i}']
+        if q1 is not None and q3 is not None:
+            iqr = q3 - q1
+            bounds[col] = (q1 - iqr_multiplier * iqr, q3 + iqr_multiplier * iqr)
+    masks = df_clean.select(
+        [((pl.col(col) < lo) | (pl.col(col) > hi)).fill_null(False).alias(col) for col, (lo, hi) in bounds.items()]
+    )
+
+    # Convert to pandas only once, at the end of the pipeline
+    pdf_clean = df_clean.to_pandas()
+    outliers = {}
+    for col in numerical_cols:
+        if col in bounds:
+            outliers[col] = pdf_clean[col][masks.get_column(col).to_numpy()]
+        else:
+            outliers[col] = pdf_clean[col].iloc[:0]
+
+    report = {}
+    report['shape'] = pdf_clean.shape
+    report['columns'] = list(pdf_clean.columns)
+    report['dtypes'] = pdf_clean.dtypes.to_dict()
+    report['missing_values'] = {col: stats[f'missing_{i}'] for i, col in enumerate(schema)}
+    report['descriptive_stats'] = {
+        col: {
+            'count': float(stats[f'count_{i}']),
+            'mean': stats[f'mean_{i}'],
+            'std': stats[f'std_{i}'],
+            'min': stats[f'min_{i}'],
+            '25%': stats[f'q1_{i}'],
+            '50%': stats[f'q2_{i}'],
+            '75%': stats[f'q3_{i}'],
+            'max': stats[f'max_{i}'],
+        }
+        for i, col in enumerate(numerical_cols)
+    }
+    report['outlier_summary'] = {
+        col: {
+            'count': len(outlier_data),
+            'percentage': (len(outlier_data) / len(pdf_clean)) * 100 if len(pdf_clean) else 0.0
+        }
+        for col, outlier_data in outliers.items()
+    }
+
+    # Correlation matrix (only for numerical columns)
+    report['correlation'] = {}
+    if len(numerical_cols) > 1:
+        for i, col in enumerate(numerical_cols):
+            report['correlation'][col] = {}
+            for j, other in enumerate(numerical_cols):
+                if i == j:
+                    report['correlation'][col][other] = 1.0
+                else:
+                    key = f'corr_{min(i, j)}_{max(i, j)}'
+                    report['correlation'][col][other] = stats[key]
+
+    return pdf_clean, outliers, report
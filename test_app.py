@@ -1,13 +1,70 @@
 #!/usr/bin/env python3
 """
 Simple test script for the CSV Analysis Flask application
+
+Run with pytest, or directly with: python test_app.py
 """
 
 import os
+import re
 import sys
 import tempfile
+import numpy as np
 import pandas as pd
-from app import app, clean_data, detect_outliers, generate_eda_report
+import pytest
+from io import BytesIO
+from app import (app, preview_table, read_csv, read_csv_table, drop_duplicate_rows, clean_data, numeric_view,
+                 detect_outliers, generate_eda_report, create_plots, save_cleaned_data,
+                 UPLOAD_FOLDER)
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client shared by all tests"""
+    with app.test_client() as client:
+        yield client
+
+def test_csv_reading():
+    """Test that uploaded CSV files are parsed into a pandas DataFrame"""
+    print("Testing CSV reading functionality...")
+    
+    csv_bytes = b"Name,Age,Salary\nJohn,25,50000\nJane,,60000\n"
+    df = read_csv(BytesIO(csv_bytes))
+    
+    assert isinstance(df, pd.DataFrame)
+    assert df.shape == (2, 3)
+    assert list(df.columns) == ['Name', 'Age', 'Salary']
+    assert df['Age'].isnull().sum() == 1
+    print(f"Parsed data shape: {df.shape}")
+    
+    # A type change after the rows used for schema inference, and duplicate headers, parse like pandas
+    csv_bytes = b"a,a\n" + b"".join(b"%d,%d\n" % (i, i) for i in range(10001)) + b"1.5,2\n"
+    df = read_csv(BytesIO(csv_bytes))
+    expected = pd.read_csv(BytesIO(csv_bytes))
+    assert list(df.columns) == list(expected.columns) == ['a', 'a.1']
+    assert df['a'].iloc[-1] == 1.5
+    
+    # Missing value markers and space-padded numbers give numerical columns, like pandas
+    csv_bytes = b"a,b,c\n1,NA, 1\n2,3, 2\nnan,N/A,3\n"
+    df = read_csv(BytesIO(csv_bytes))
+    pd.testing.assert_frame_equal(df, pd.read_csv(BytesIO(csv_bytes)))
+    assert df['b'].isnull().sum() == 2
+    
+    print("✅ CSV reading test passed!\n")
+
+def test_csv_table_reading():
+    """Test that uploaded CSV files are parsed into a pyarrow Table for the polars pipeline"""
+    print("Testing CSV table reading functionality...")
+    
+    pytest.importorskip('pyarrow')
+    csv_bytes = b"a,a,a.1,b\n1,2,3,\n4,5,6,x\n"
+    table = read_csv_table(BytesIO(csv_bytes))
+    
+    # Duplicate headers are renamed like pandas does
+    assert table.column_names == list(pd.read_csv(BytesIO(csv_bytes)).columns) == ['a', 'a.2', 'a.1', 'b']
+    assert table.column('b').null_count == 1
+    print(f"Parsed table columns: {table.column_names}")
+    
+    print("✅ CSV table reading test passed!\n")
 
 def test_data_cleaning():
     """Test the data cleaning functionality"""
@@ -31,9 +88,58 @@ def test_data_cleaning():
     print(f"Cleaned data shape: {df_clean.shape}")
     print(f"Missing values after cleaning: {df_clean.isnull().sum().sum()}")
     print(f"Duplicates after cleaning: {df_clean.duplicated().sum()}")
+    assert df_clean.shape == (5, 4)
+    assert df.shape == (6, 4)  # The original data is left untouched
+    assert df_clean.isnull().sum().sum() == 0
+    assert df_clean.duplicated().sum() == 0
+    
+    # A categorical column without any values is filled with 'Unknown'
+    df_clean = clean_data(pd.DataFrame({'Empty': [None, None], 'Value': [1, 2]}))
+    assert df_clean['Empty'].tolist() == ['Unknown', 'Unknown']
+    
+    # Missing values and signed zeros count as duplicates, like in pandas
+    df = pd.DataFrame({
+        'Value': [0.0, -0.0, np.nan, np.nan, 1.0, 0.0],
+        'Label': ['y', 'y', 'z', 'z', None, 'y']
+    })
+    pd.testing.assert_frame_equal(drop_duplicate_rows(df), df.drop_duplicates())
+    
+    # Nullable text together with numerical columns, at a size where Arrow's grouping misbehaved
+    df = pd.DataFrame({
+        'Label': [None if i % 3 == 0 else 'x' for i in range(100)],
+        'Value': np.arange(100) * 1.5,
+        'Count': np.arange(100)
+    })
+    df = pd.concat([df, df], ignore_index=True)
+    pd.testing.assert_frame_equal(drop_duplicate_rows(df), df.drop_duplicates())
     
     print("✅ Data cleaning test passed!\n")
 
+def test_numeric_view(monkeypatch):
+    """Test the numerical block extraction, including low precision EDA"""
+    print("Testing numerical view functionality...")
+    
+    test_data = {
+        'Float_Col': [0.1, 0.2, 0.3],
+        'Int_Col': [1, 2, 3],
+        'Categorical_Col': ['A', 'B', 'C']
+    }
+    
+    df = pd.DataFrame(test_data)
+    nv = numeric_view(df)
+    assert list(nv.cols) == ['Float_Col', 'Int_Col']
+    assert nv.arr.dtype == 'float64'
+    
+    # Low precision EDA only changes the analysis block, never the data itself
+    monkeypatch.setattr('app.LOW_PRECISION_EDA', True)
+    nv = numeric_view(df)
+    assert nv.arr.dtype == 'float32'
+    assert df['Float_Col'].dtype == 'float64'
+    assert df['Float_Col'].tolist() == [0.1, 0.2, 0.3]
+    print(f"Numerical block dtype with low precision EDA: {nv.arr.dtype}")
+    
+    print("✅ Numerical view test passed!\n")
+
 def test_outlier_detection():
     """Test the outlier detection functionality"""
     print("Testing outlier detection functionality...")
@@ -49,13 +155,53 @@ def test_outlier_detection():
     # Test IQR method
     outliers_iqr = detect_outliers(df, method='iqr')
     print(f"Outliers detected (IQR): {len(outliers_iqr.get('With_Outliers', []))}")
+    assert len(outliers_iqr['Normal_Values']) == 0
+    assert outliers_iqr['With_Outliers'].tolist() == [100]
     
     # Test Z-score method
     outliers_zscore = detect_outliers(df, method='zscore')
     print(f"Outliers detected (Z-score): {len(outliers_zscore.get('With_Outliers', []))}")
+    assert len(outliers_zscore['Normal_Values']) == 0
+    
+    # Missing values are skipped without shifting the flagged rows
+    values = [float(i % 5) for i in range(20)]
+    values[3] = np.nan
+    values[15] = 100.0
+    outliers_zscore = detect_outliers(pd.DataFrame({'With_Missing': values}), method='zscore')
+    assert outliers_zscore['With_Missing'].to_dict() == {15: 100.0}
     
     print("✅ Outlier detection test passed!\n")
 
+def test_outlier_kernels():
+    """Test that the numba outlier kernels match numpy and scipy"""
+    print("Testing numba outlier kernels...")
+    
+    pytest.importorskip('numba')
+    from kernels import iqr_mask, zscore_mask
+    
+    from scipy import stats
+    rng = np.random.default_rng(42)
+    arr = rng.standard_t(3, size=(1000, 3))
+    arr[::7, 1] = np.nan
+    arr[:, 2] = 5.0  # Constant column has no outliers
+    
+    with np.errstate(invalid='ignore'):
+        expected = np.abs(stats.zscore(arr, axis=0, nan_policy='omit')) > 3
+    mask = zscore_mask(arr, 3.0)
+    assert (mask == expected).all()
+    print(f"Z-score outliers flagged per column: {mask.sum(axis=0).tolist()}")
+    
+    lower, upper = np.full(3, -2.0), np.full(3, 2.0)
+    expected = (arr < lower) | (arr > upper)
+    bits, counts = iqr_mask(arr, lower, upper)
+    for j in range(3):
+        col_mask = np.unpackbits(bits[j].view(np.uint8), count=len(arr), bitorder='little')
+        assert (col_mask.astype(bool) == expected[:, j]).all()
+    assert (counts == expected.sum(axis=0)).all()
+    print(f"IQR outliers flagged per column: {counts.tolist()}")
+    
+    print("✅ Outlier kernels test passed!\n")
+
 def test_eda_report():
     """Test the EDA report generation"""
     print("Testing EDA report generation...")
@@ -75,49 +221,163 @@ def test_eda_report():
     print(f"Columns: {report['columns']}")
     print(f"Data types: {report['dtypes']}")
     
+    # Statistics and correlations match pandas, with missing values excluded pairwise
+    df = pd.DataFrame({'a': [1, 2, np.nan, 4, 5], 'b': [2, 1, 4, 3, 9]})
+    report = generate_eda_report(df, detect_outliers(df))
+    pd.testing.assert_frame_equal(pd.DataFrame(report['descriptive_stats']), df.describe())
+    pd.testing.assert_frame_equal(pd.DataFrame(report['correlation']), df.corr())
+    
+    # A single row has no correlation, but still gives a full matrix
+    df = df.head(1)
+    report = generate_eda_report(df, detect_outliers(df))
+    pd.testing.assert_frame_equal(pd.DataFrame(report['correlation']), df.corr())
+    
     print("✅ EDA report generation test passed!\n")
 
-def test_flask_app():
-    """Test if Flask app can be created"""
-    print("Testing Flask application creation...")
+def test_polars_pipeline():
+    """Test that the polars pipeline matches the pandas implementation"""
+    print("Testing polars pipeline functionality...")
     
-    try:
-        # Test if app can be created
-        with app.test_client() as client:
-            # Test home route
-            response = client.get('/')
-            assert response.status_code == 200
-            print("✅ Home route test passed!")
-            
-            # Test that app is working
-            assert app.name == 'app'
-            print("✅ Flask app creation test passed!")
-            
-    except Exception as e:
-        print(f"❌ Flask app test failed: {e}")
-        return False
-    
-    return True
-
-def main():
-    """Run all tests"""
-    print("🚀 Starting CSV Analysis App Tests...\n")
+    pytest.importorskip('polars')
+    from pipeline import run_pipeline
+    
+    test_data = {
+        'Name': ['John', 'Jane', 'John', 'Mike', 'Sarah', None],
+        'Age': [25, 30, 25, 35, 28, None],
+        'Salary': [50000, 60000, 50000, 70000, 55000, 650000],
+        'Department': ['IT', 'HR', 'IT', 'Sales', 'IT', 'Marketing']
+    }
+    
+    df = pd.DataFrame(test_data)
+    df_clean = clean_data(df)
+    outliers = detect_outliers(df_clean)
+    
+    pl_clean, pl_outliers, pl_report = run_pipeline(df)
+    assert pl_clean.shape == df_clean.shape
+    assert pl_clean.isnull().sum().sum() == 0
+    assert {col: len(v) for col, v in pl_outliers.items()} == {col: len(v) for col, v in outliers.items()}
+    print(f"Pipeline report keys: {list(pl_report.keys())}")
+    
+    print("✅ Polars pipeline test passed!\n")
+
+def test_create_plots():
+    """Test the plot creation, including columns with infinite values"""
+    print("Testing plot creation functionality...")
+    
+    test_data = {
+        'With_Inf': [1.0, 2.0, np.inf, 4.0, -np.inf, 5.0],
+        'Normal_Values': [1, 2, 3, 4, 5, 6]
+    }
+    
+    df = pd.DataFrame(test_data)
+    with np.errstate(invalid='ignore'):
+        plots = create_plots(df, detect_outliers(df))
+    
+    assert set(plots['histograms']) == set(plots['boxplots']) == {'With_Inf', 'Normal_Values'}
+    assert 'correlation_heatmap' in plots
+    print(f"Plots created: {list(plots.keys())}")
+    
+    print("✅ Plot creation test passed!\n")
+
+def test_preview_table():
+    """Test the HTML preview table rendering"""
+    print("Testing preview table rendering...")
+    
+    df = pd.DataFrame({
+        'Name': ['<b>John</b>', 'Jane'] * 10,
+        'Age': [25, None] * 10
+    })
+    html = preview_table(df)
+    
+    assert html.count('<tr>') == 11  # Header plus the first 10 rows
+    assert '&lt;b&gt;John&lt;/b&gt;' in html
+    assert '<td>NaN</td>' in html
+    
+    # Cell values are formatted like DataFrame.to_html
+    df = pd.DataFrame({
+        'Float': [0.1 + 0.2, np.nan],
+        'Date': pd.to_datetime(['2020-01-01', None]),
+        'Flag': [True, None]
+    })
+    html = preview_table(df)
+    assert re.findall(r'<td>(.*?)</td>', html) == re.findall(r'<td>(.*?)</td>', df.to_html(index=False))
+    assert '<td>0.3</td>' in html and '<td>2020-01-01</td>' in html and '<td>NaT</td>' in html
+    
+    print("✅ Preview table test passed!\n")
+
+def test_results_cache(client, monkeypatch, tmp_path):
+    """Test that analysis results are cached, but only successful AI insights are"""
+    print("Testing results cache functionality...")
+    
+    import app as app_module
+    monkeypatch.setattr(app_module, 'CACHE_FOLDER', str(tmp_path))
+    monkeypatch.setattr(app_module.openai, 'api_key', None)
+    app_module.load_cached_results.cache_clear()
+    csv_bytes = b"Name,Age,Salary\nJohn,25,50000\nJane,,60000\nMike,35,70000\n"
+    key = app_module.results_cache_key(csv_bytes)
+    
+    # Without an API key the analysis is cached, the "not configured" message is not
+    client.post('/analyze', data={'file': (BytesIO(csv_bytes), 'data.csv')})
+    assert (tmp_path / f'{key}.pkl').exists()
+    assert not (tmp_path / f'{key}-ai.pkl').exists()
+    
+    # Once insights succeed for a re-upload, they are cached as well
+    monkeypatch.setattr(app_module.openai, 'api_key', 'test-key')
+    monkeypatch.setattr(app_module, 'request_ai_insights', lambda report, outliers: 'Insights')
+    client.post('/analyze', data={'file': (BytesIO(csv_bytes), 'data.csv')})
+    assert app_module.load_cached_results(f'{key}-ai') == 'Insights'
     
+    # Old entries are deleted beyond the size limit
+    app_module.prune_cached_results(max_entries=1)
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
+    app_module.load_cached_results.cache_clear()
+    
+    print("✅ Results cache test passed!\n")
+
+def test_download_file(client):
+    """Test downloading the cleaned data as Parquet and as CSV"""
+    print("Testing cleaned data download...")
+    
+    pytest.importorskip('pyarrow')
+    df = pd.DataFrame({
+        'Value': [0.1, 0.2, 0.3],
+        'Flag': [True, False, True],
+        'Date': pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-03']),
+        'Label': ['a', 'b', 'c']
+    })
+    # Served from the uploads folder, since relative download paths are resolved against the app
+    saved_path = save_cleaned_data(df)
+    path = os.path.join(UPLOAD_FOLDER, os.path.basename(saved_path))
+    os.replace(saved_path, path)
     try:
-        test_data_cleaning()
-        test_outlier_detection()
-        test_eda_report()
+        response = client.get(f'/download/{path}')
+        assert response.status_code == 200
+        pd.testing.assert_frame_equal(pd.read_parquet(BytesIO(response.data)), df)
         
-        if test_flask_app():
-            print("🎉 All tests passed! The application is ready to run.")
-            print("\nTo start the application, run:")
-            print("python app.py")
-        else:
-            print("❌ Some tests failed. Please check the errors above.")
-            
-    except Exception as e:
-        print(f"❌ Test suite failed with error: {e}")
-        sys.exit(1)
+        # The CSV has the same format as DataFrame.to_csv
+        response = client.get(f'/download/{path}?format=csv')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.data.decode() == df.to_csv(index=False)
+    finally:
+        os.remove(path)
+    
+    print("✅ Download test passed!\n")
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(app.root_path, app.template_folder, 'index.html')),
+                    reason="templates/index.html is not available")
+def test_flask_app(client):
+    """Test if Flask app can be created"""
+    print("Testing Flask application creation...")
+    
+    # Test home route
+    response = client.get('/')
+    assert response.status_code == 200
+    print("✅ Home route test passed!")
+    
+    # Test that app is working
+    assert app.name == 'app'
+    print("✅ Flask app creation test passed!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(pytest.main([__file__, '-v']))
\ No newline at end of file